@@ -3,46 +3,242 @@
 
 Reads asset_manifest.json and runs convert_sprite.py / convert_background.py
 for each entry. Supports --phase flag to only convert assets for a specific phase.
+Assets are independent, so they are converted in parallel across processes;
+assets sharing a source image go to the same worker so it is decoded once.
+Assets whose source file and conversion parameters are unchanged since the last
+run (tracked in .convert_cache.json) are skipped.
 
 Usage:
     python tools/batch_convert.py                 # Convert all assets
     python tools/batch_convert.py --phase 3       # Only Phase 3 verification set
+    python tools/batch_convert.py --force         # Ignore the conversion cache
+    python tools/batch_convert.py --jobs 4        # Limit worker processes
 """
 
 import argparse
+import hashlib
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 # Add tools directory to path for imports
 TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, TOOLS_DIR)
 
+from PIL import Image
+
 from convert_sprite import convert_sprite
 from convert_background import convert_background
 
+CACHE_PATH = os.path.join(TOOLS_DIR, ".convert_cache.json")
+
+# Manifest fields that affect conversion output; changing any invalidates the cache
+CACHE_PARAMS = ("type", "size", "width", "height", "colors", "method")
+
+# Converter code also affects output (filters, default colors and quantizer,
+# ...), so its hash is part of every fingerprint. Batch runs rely on the
+# converters' keyword defaults; see _converter_options.
+CONVERTER_MODULES = ("convert_sprite.py", "convert_background.py", "convert_common.py")
+
+
+def _converter_version():
+    """Hash the converter sources so code changes invalidate the cache."""
+    digest = hashlib.sha256()
+    for name in CONVERTER_MODULES:
+        with open(os.path.join(TOOLS_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+CONVERTER_VERSION = _converter_version()
+
 
 def load_manifest():
-    """Load the asset manifest JSON."""
+    """Load the asset manifest.
+
+    Prefers asset_manifest.bin (see compile_manifest.py) when it is newer than
+    the JSON and msgpack is installed; otherwise parses the JSON.
+    """
     manifest_path = os.path.join(TOOLS_DIR, "asset_manifest.json")
+    bin_path = os.path.join(TOOLS_DIR, "asset_manifest.bin")
+
+    if (os.path.isfile(bin_path)
+            and os.path.getmtime(bin_path) >= os.path.getmtime(manifest_path)):
+        try:
+            import msgpack
+        except ImportError:
+            pass
+        else:
+            with open(bin_path, "rb") as f:
+                return msgpack.unpackb(f.read(), raw=False)
+
     with open(manifest_path, "r") as f:
         return json.load(f)
 
 
-def process_assets(manifest, phase_filter=None):
+def load_cache():
+    """Load the conversion cache, or an empty one if missing or unreadable."""
+    try:
+        with open(CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    """Write the conversion cache atomically."""
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def _fingerprint(asset, source_path):
+    """Identify a conversion by source file stat, asset parameters and
+    converter version.
+
+    Returns None if the source file does not exist.
+    """
+    try:
+        st = os.stat(source_path)
+    except OSError:
+        return None
+    return {
+        "source": source_path,
+        "mtime": st.st_mtime_ns,
+        "size": st.st_size,
+        "params": [asset.get(key) for key in CACHE_PARAMS],
+        "converter": CONVERTER_VERSION,
+    }
+
+
+def _is_up_to_date(entry, fingerprint, output_path):
+    """Check a cache entry against the current source and output files."""
+    if entry is None or fingerprint is None:
+        return False
+    if entry["fingerprint"] != fingerprint:
+        return False
+    try:
+        return os.stat(output_path).st_mtime_ns == entry["output_mtime"]
+    except OSError:
+        return False
+
+
+# Optional manifest field -> converter keyword argument
+CONVERTER_OPTIONS = {"colors": "max_colors", "method": "method"}
+
+
+def _converter_options(asset):
+    """Keyword arguments for the optional fields a manifest entry sets.
+
+    Unset fields are left to the converter's own defaults, which are covered
+    by CONVERTER_VERSION.
+    """
+    return {kwarg: asset[field] for field, kwarg in CONVERTER_OPTIONS.items()
+            if field in asset}
+
+
+def _convert_sprite_asset(asset, source_path, output_path, image):
+    """Run convert_sprite with a manifest entry's parameters."""
+    convert_sprite(source_path, output_path, asset["size"],
+                   image=image, **_converter_options(asset))
+
+
+def _convert_background_asset(asset, source_path, output_path, image):
+    """Run convert_background with a manifest entry's parameters."""
+    convert_background(source_path, output_path, asset["width"], asset["height"],
+                       image=image, **_converter_options(asset))
+
+
+# Manifest asset "type" -> converter(asset, source_path, output_path, image)
+CONVERTERS = {
+    "sprite": _convert_sprite_asset,
+    "background": _convert_background_asset,
+}
+
+
+def _convert_one(asset, source_path, output_root, image):
+    """Convert a single manifest asset from its decoded source image.
+
+    Returns:
+        ("ok", None) on success, ("skip", reason) if the asset was skipped, or
+        ("fail", reason) if the converter raised or exited.
+    """
+    output_path = os.path.join(output_root, asset["output"])
+
+    convert = CONVERTERS.get(asset["type"])
+    if convert is None:
+        return "skip", f"Unknown type '{asset['type']}' for {asset['id']}"
+
+    # Converters sys.exit() on bad parameters; keep that from killing the worker
+    try:
+        convert(asset, source_path, output_path, image)
+    except (Exception, SystemExit) as e:
+        return "fail", f"Failed to convert {asset['id']}: {type(e).__name__}: {e}"
+    return "ok", None
+
+
+def _convert_group(assets, source_root, output_root):
+    """Convert assets that share a source image. Runs in a worker process.
+
+    The source is decoded once for the whole group; converters only read it
+    (they convert() to a copy first).
+
+    Returns:
+        One _convert_one result per asset, in order.
+    """
+    source_path = os.path.join(source_root, assets[0]["source"])
+
+    if not os.path.isfile(source_path):
+        return [("skip", f"Source not found, skipping: {source_path}")] * len(assets)
+
+    try:
+        image = Image.open(source_path)
+        image.load()
+    except Exception as e:
+        reason = f"cannot read {source_path}: {type(e).__name__}: {e}"
+        return [("fail", f"Failed to convert {asset['id']}: {reason}")
+                for asset in assets]
+
+    return [_convert_one(asset, source_path, output_root, image)
+            for asset in assets]
+
+
+def _group_cost(assets):
+    """Estimate conversion work for a group as its total output pixel count."""
+    return sum(asset.get("width", asset.get("size", 0))
+               * asset.get("height", asset.get("size", 0))
+               for asset in assets)
+
+
+def process_assets(manifest, phase_filter=None, use_cache=True, jobs=None):
     """Process all assets in the manifest.
 
     Args:
         manifest: Parsed manifest dict.
         phase_filter: If set, only process assets with this phase number.
+        use_cache: If False, reconvert assets even when the cache says they
+            are up to date. Cache entries for other assets are kept.
+        jobs: Number of worker processes, or None for the executor default.
+
+    Returns:
+        Tuple of (converted, up_to_date, skipped, failed) counts.
     """
     source_root = manifest["source_root"]
     output_root = manifest["output_root"]
+    cache = load_cache()
 
     converted = 0
+    up_to_date = 0
     skipped = 0
+    failed = 0
 
-    # Iterate all categories
+    # Collect assets from all categories, grouped by source image so each
+    # source is decoded once
+    groups = {}
+    fingerprints = {}
     for category, assets in manifest["assets"].items():
         for asset in assets:
             # Phase filter
@@ -50,37 +246,72 @@ def process_assets(manifest, phase_filter=None):
                 skipped += 1
                 continue
 
+            # Unchanged since the last conversion
             source_path = os.path.join(source_root, asset["source"])
             output_path = os.path.join(output_root, asset["output"])
-
-            if not os.path.isfile(source_path):
-                print(f"  WARNING: Source not found, skipping: {source_path}",
-                      file=sys.stderr)
-                skipped += 1
+            fingerprint = _fingerprint(asset, source_path)
+            if use_cache and _is_up_to_date(cache.get(output_path), fingerprint,
+                                            output_path):
+                up_to_date += 1
                 continue
 
-            if asset["type"] == "sprite":
-                convert_sprite(source_path, output_path,
-                               asset["size"], asset.get("colors", 15))
-            elif asset["type"] == "background":
-                convert_background(source_path, output_path,
-                                   asset["width"], asset["height"],
-                                   asset.get("colors", 16))
-            else:
-                print(f"  WARNING: Unknown type '{asset['type']}' for {asset['id']}",
-                      file=sys.stderr)
-                skipped += 1
-                continue
+            groups.setdefault(asset["source"], []).append(asset)
+            fingerprints[output_path] = fingerprint
+
+    # Heaviest first (longest-processing-time scheduling): big backgrounds
+    # start immediately and small sprites fill in the tail
+    groups = sorted(groups.values(), key=_group_cost, reverse=True)
+
+    # max_workers=None lets the executor pick its default, which is capped
+    # on Windows (explicit values above 61 raise ValueError there)
+    # Save whatever converted even if the run is interrupted, so the next run
+    # does not redo it
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            group_results = executor.map(_convert_group, groups,
+                                         repeat(source_root), repeat(output_root),
+                                         chunksize=1)
+            for group, results in zip(groups, group_results):
+                for asset, (status, msg) in zip(group, results):
+                    if status == "ok":
+                        converted += 1
+                        output_path = os.path.join(output_root, asset["output"])
+                        cache[output_path] = {
+                            "fingerprint": fingerprints[output_path],
+                            "output_mtime": os.stat(output_path).st_mtime_ns,
+                        }
+                    elif status == "fail":
+                        print(f"  ERROR: {msg}", file=sys.stderr)
+                        failed += 1
+                    else:
+                        print(f"  WARNING: {msg}", file=sys.stderr)
+                        skipped += 1
+    finally:
+        if converted:
+            save_cache(cache)
 
-            converted += 1
+    return converted, up_to_date, skipped, failed
 
-    return converted, skipped
+
+def _positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
 
 
 def main():
     parser = argparse.ArgumentParser(description="Batch asset conversion for SNES")
     parser.add_argument("--phase", type=int, default=None,
                         help="Only convert assets for this phase number")
+    parser.add_argument("--force", action="store_true",
+                        help="Reconvert all assets, ignoring the conversion cache")
+    parser.add_argument("--jobs", type=_positive_int, default=None,
+                        help="Worker processes (default: CPU count)")
     args = parser.parse_args()
 
     manifest = load_manifest()
@@ -88,11 +319,16 @@ def main():
     phase_str = f" (phase {args.phase})" if args.phase else " (all phases)"
     print(f"=== Batch Asset Conversion{phase_str} ===")
 
-    converted, skipped = process_assets(manifest, args.phase)
+    converted, up_to_date, skipped, failed = process_assets(
+        manifest, args.phase, use_cache=not args.force, jobs=args.jobs)
+
+    print(f"=== Done: {converted} converted, {up_to_date} up to date, "
+          f"{skipped} skipped, {failed} failed ===")
 
-    print(f"=== Done: {converted} converted, {skipped} skipped ===")
+    if failed:
+        sys.exit(1)
 
-    if converted == 0:
+    if converted == 0 and up_to_date == 0:
         print("WARNING: No assets were converted!", file=sys.stderr)
         sys.exit(1)
 
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""compile_manifest.py - Compile asset_manifest.json to a binary msgpack blob.
+
+batch_convert.py loads asset_manifest.bin instead of the JSON when the binary
+file is newer, which skips JSON parsing on every invocation. Re-run this after
+editing the manifest (batch_convert.py falls back to the JSON if it is stale).
+
+Usage:
+    python tools/compile_manifest.py
+
+Requires: msgpack
+"""
+
+import json
+import os
+import sys
+
+import msgpack
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_JSON = os.path.join(TOOLS_DIR, "asset_manifest.json")
+MANIFEST_BIN = os.path.join(TOOLS_DIR, "asset_manifest.bin")
+
+
+def compile_manifest(json_path=MANIFEST_JSON, bin_path=MANIFEST_BIN):
+    """Serialize the JSON manifest to msgpack.
+
+    Args:
+        json_path: Source manifest JSON path.
+        bin_path: Output msgpack path.
+    """
+    with open(json_path, "r") as f:
+        manifest = json.load(f)
+
+    tmp_path = bin_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(msgpack.packb(manifest, use_bin_type=True))
+    os.replace(tmp_path, bin_path)
+
+    print(f"  Manifest: {json_path} -> {bin_path} ({os.path.getsize(bin_path)} bytes)")
+
+
+def main():
+    if not os.path.isfile(MANIFEST_JSON):
+        print(f"Error: Manifest not found: {MANIFEST_JSON}", file=sys.stderr)
+        sys.exit(1)
+
+    compile_manifest()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,41 @@ Takes a high-res PNG, resizes to target dimensions, reduces to 16 colors,
 and outputs an indexed-mode PNG suitable for gfx4snes. No transparency handling.
 
 Usage:
-    python convert_background.py INPUT OUTPUT --width 256 --height 256 [--colors 16]
+    python convert_background.py INPUT OUTPUT --width 256 --height 256 [--colors 16] [--method fastoctree]
 """
 
 import argparse
 import os
 import sys
+
+import numpy as np
 from PIL import Image
 
+from convert_common import QUANTIZE_METHODS, quantize_method, resize_filter
+
+
+def _index_exact(img, colors):
+    """Index an RGB image that already fits its palette, without quantizing.
+
+    Args:
+        img: RGB image.
+        colors: Result of img.getcolors(), a list of (count, (r, g, b)).
+    """
+    palette = np.array([rgb for _, rgb in colors], dtype=np.uint8)
+    keys = (palette.astype(np.uint32) << [16, 8, 0]).sum(axis=1)
+    order = np.argsort(keys)
 
-def convert_background(input_path, output_path, width, height, max_colors=16):
+    arr = np.asarray(img, dtype=np.uint32)
+    pixels = (arr[..., 0] << 16) | (arr[..., 1] << 8) | arr[..., 2]
+    indices = order[np.searchsorted(keys[order], pixels)].astype(np.uint8)
+
+    out = Image.fromarray(indices, "P")
+    out.putpalette(palette.tobytes())
+    return out
+
+
+def convert_background(input_path, output_path, width, height, max_colors=16,
+                       method="fastoctree", image=None):
     """Convert an RGB PNG to a SNES-compatible indexed PNG.
 
     Args:
@@ -23,19 +48,32 @@ def convert_background(input_path, output_path, width, height, max_colors=16):
         width: Target width in pixels.
         height: Target height in pixels.
         max_colors: Maximum colors (1-16, default 16).
+        method: Quantizer name, one of QUANTIZE_METHODS.
+        image: Already-decoded source image to use instead of opening
+            input_path. It is not modified.
     """
     if max_colors < 1 or max_colors > 16:
         print(f"Error: colors must be 1-16, got {max_colors}", file=sys.stderr)
         sys.exit(1)
 
-    # Open and convert to RGB (drop alpha if present)
-    img = Image.open(input_path).convert("RGB")
-
-    # Resize to target dimensions
-    img = img.resize((width, height), Image.LANCZOS)
-
-    # Quantize to max_colors using median cut
-    quantized = img.quantize(colors=max_colors, method=Image.Quantize.MEDIANCUT)
+    # Open and convert to RGB (drop alpha if present; always a new image)
+    if image is None:
+        image = Image.open(input_path)
+    img = image.convert("RGB")
+
+    # Resize to target dimensions (skip if already there)
+    # BILINEAR is enough for non-integer ratios: 16-color quantization hides
+    # the extra aliasing
+    if img.size != (width, height):
+        img = img.resize((width, height),
+                         resize_filter(img.size, (width, height), Image.BILINEAR))
+
+    # Quantize to max_colors, unless the image already has few enough colors
+    colors = img.getcolors(maxcolors=max_colors)
+    if colors:
+        quantized = _index_exact(img, colors)
+    else:
+        quantized = img.quantize(colors=max_colors, method=quantize_method(method))
 
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
@@ -52,13 +90,17 @@ def main():
     parser.add_argument("--height", type=int, required=True, help="Target height")
     parser.add_argument("--colors", type=int, default=16,
                         help="Max colors (1-16, default 16)")
+    parser.add_argument("--method", default="fastoctree",
+                        choices=sorted(QUANTIZE_METHODS),
+                        help="Color quantizer (default fastoctree)")
     args = parser.parse_args()
 
     if not os.path.isfile(args.input):
         print(f"Error: Input file not found: {args.input}", file=sys.stderr)
         sys.exit(1)
 
-    convert_background(args.input, args.output, args.width, args.height, args.colors)
+    convert_background(args.input, args.output, args.width, args.height,
+                       args.colors, args.method)
 
 
 if __name__ == "__main__":
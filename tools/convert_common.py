@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""convert_common.py - Helpers shared by convert_sprite.py and convert_background.py."""
+
+import sys
+
+from PIL import Image, features
+
+# Quantizer choices for --method. libimagequant is optional in Pillow builds.
+QUANTIZE_METHODS = {
+    "mediancut": Image.Quantize.MEDIANCUT,
+    "fastoctree": Image.Quantize.FASTOCTREE,
+    "libimagequant": Image.Quantize.LIBIMAGEQUANT,
+}
+HAS_LIBIMAGEQUANT = features.check_feature("libimagequant")
+
+
+def quantize_method(name):
+    """Map a --method name to a Pillow quantizer, falling back to median cut."""
+    if name == "libimagequant" and not HAS_LIBIMAGEQUANT:
+        print("  Warning: Pillow built without libimagequant, using mediancut",
+              file=sys.stderr)
+        name = "mediancut"
+    return QUANTIZE_METHODS[name]
+
+
+def resize_filter(src_size, dst_size, default):
+    """Pick a resize filter: BOX for integer downscales, else default.
+
+    BOX averaging is exact when both axes shrink by a whole-number ratio of at
+    least 2, and much cheaper than LANCZOS.
+    """
+    for src, dst in zip(src_size, dst_size):
+        ratio = src / dst
+        if ratio < 2 or not ratio.is_integer():
+            return default
+    return Image.BOX
@@ -5,25 +5,29 @@ Converts source WAV files to SNES BRR format.
 Pipeline:
   1. Load source WAV (stereo, 44.1kHz, 16-bit)
   2. Convert to mono (average channels)
-  3. Downsample to 16000 Hz
-  4. Trim leading silence
-  5. Truncate to max duration (short SFX)
-  6. Normalize amplitude
-  7. Ensure sample count is multiple of 16 (BRR block alignment)
-  8. Write 16-bit mono WAV at 16kHz
-  9. Run snesbrr -e to produce .brr file
+  3. Trim leading silence
+  4. Resample to 16000 Hz (polyphase FIR, anti-aliased), only up to
+     the max duration (short SFX)
+  5. Normalize amplitude
+  6. Ensure sample count is multiple of 16 (BRR block alignment)
+  7. Write 16-bit mono WAV at 16kHz
+  8. Run snesbrr -e to produce .brr files (all sounds concurrently)
 
 Usage:
   python tools/convert_sfx.py
 
-Requires: snesbrr.exe in PVSnesLib tools path
+Requires: snesbrr.exe in PVSnesLib tools path, numpy, scipy, soundfile
 """
 
-import wave
-import struct
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
 
 # === Configuration ===
 SRC_DIR = "C:/Users/Ryan Rentfro/Downloads/RawSounds"
@@ -48,85 +52,74 @@ MAPPINGS = [
 
 def read_wav_mono(filepath):
     """Read a WAV file and return mono 16-bit samples at original rate."""
-    w = wave.open(filepath, 'rb')
-    nch = w.getnchannels()
-    rate = w.getframerate()
-    nframes = w.getnframes()
-    raw = w.readframes(nframes)
-    w.close()
-
-    samples = struct.unpack('<' + 'h' * (nframes * nch), raw)
-
-    # Convert to mono
-    mono = []
-    for i in range(0, len(samples), nch):
-        s = 0
-        for c in range(nch):
-            s += samples[i + c]
-        mono.append(s // nch)
+    samples, rate = sf.read(filepath, dtype='int16', always_2d=True)
+
+    # Convert to mono (floor of the channel average)
+    mono = samples.sum(axis=1, dtype=np.int32) // samples.shape[1]
 
     return mono, rate
 
 
-def downsample(samples, src_rate, dst_rate):
-    """Simple downsampling by nearest-neighbor."""
-    ratio = src_rate / dst_rate
-    out = []
-    i = 0.0
-    while int(i) < len(samples):
-        out.append(samples[int(i)])
-        i += ratio
-    return out
-
-
-def trim_silence(samples, threshold):
-    """Remove leading silence below threshold."""
-    start = 0
-    for i, s in enumerate(samples):
-        if abs(s) > threshold:
-            start = i
-            break
-    # Small lead-in (16 samples = 1 BRR block)
-    start = max(0, start - 16)
+def resample(samples, src_rate, dst_rate, max_out=None):
+    """Resample with a polyphase lowpass filter (no aliasing).
+
+    If max_out is given, only the source span needed for the first max_out
+    output samples (plus the filter's reach) is resampled.
+    """
+    g = gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    if max_out is not None:
+        # resample_poly's default filter spans 10 * max(up, down) taps per side
+        # at the upsampled rate; keep that much extra input past the cut
+        needed = -(-max_out * down // up)  # ceil(max_out * down / up)
+        margin = 10 * max(up, down) // up + 1
+        samples = samples[:needed + margin]
+    out = resample_poly(samples, up, down)[:max_out]
+    return np.round(out).astype(np.int32)
+
+
+def trim_silence(samples, threshold, lead_in=16):
+    """Remove leading silence below threshold, keeping lead_in samples."""
+    loud = np.abs(samples) > threshold
+    start = int(np.argmax(loud)) if loud.any() else 0
+    start = max(0, start - lead_in)
     return samples[start:]
 
 
 def normalize(samples, target_peak=28000):
     """Normalize amplitude to target peak."""
-    peak = max(abs(s) for s in samples) if samples else 1
+    if len(samples) == 0:
+        return samples.astype(np.int16)
+    # Two reductions instead of materializing np.abs(samples)
+    peak = max(int(samples.max()), -int(samples.min()))
     if peak == 0:
-        return samples
+        return samples.astype(np.int16)  # silent, nothing to scale
     scale = target_peak / peak
-    return [max(-32768, min(32767, int(s * scale))) for s in samples]
+    return np.clip(samples * scale, -32768, 32767).astype(np.int16)
 
 
 def align_brr(samples):
     """Pad to multiple of 16 samples (BRR block size)."""
-    remainder = len(samples) % 16
-    if remainder != 0:
-        samples.extend([0] * (16 - remainder))
-    return samples
+    pad = -len(samples) % 16
+    if pad == 0:
+        return samples
+    return np.pad(samples, (0, pad))
 
 
 def write_wav(filepath, samples, rate):
     """Write mono 16-bit WAV."""
-    w = wave.open(filepath, 'wb')
-    w.setnchannels(1)
-    w.setsampwidth(2)
-    w.setframerate(rate)
-    raw = struct.pack('<' + 'h' * len(samples), *samples)
-    w.writeframes(raw)
-    w.close()
+    # asarray is a no-op for the int16 arrays normalize() returns
+    sf.write(filepath, np.asarray(samples, dtype='<i2'), rate, subtype='PCM_16')
 
 
 def convert_to_brr(wav_path, brr_path):
     """Run snesbrr to convert WAV to BRR."""
     result = subprocess.run(
         [SNESBRR, "-e", wav_path, brr_path],
-        capture_output=True, text=True
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
     )
     if result.returncode != 0:
-        print(f"  ERROR: snesbrr failed: {result.stderr}")
+        print(f"  ERROR: snesbrr failed on {wav_path}: {result.stderr}")
         return False
     return True
 
@@ -136,6 +129,7 @@ def main():
 
     total_brr_size = 0
     success = 0
+    pending = []  # (out_name, wav_out, brr_out) ready for snesbrr
 
     for src_name, out_name, max_dur in MAPPINGS:
         src_path = os.path.join(SRC_DIR, src_name)
@@ -152,37 +146,44 @@ def main():
         mono, src_rate = read_wav_mono(src_path)
         print(f"  Source: {len(mono)} samples @ {src_rate}Hz")
 
-        # Downsample
-        resampled = downsample(mono, src_rate, TARGET_RATE)
-        print(f"  Downsampled: {len(resampled)} samples @ {TARGET_RATE}Hz")
-
-        # Trim leading silence
-        trimmed = trim_silence(resampled, SILENCE_THRESHOLD)
-        print(f"  After trim: {len(trimmed)} samples")
+        # Trim leading silence at the source rate, keeping a lead-in of
+        # 1 BRR block (16 samples at TARGET_RATE)
+        lead_in = 16 * src_rate // TARGET_RATE
+        trimmed = trim_silence(mono, SILENCE_THRESHOLD, lead_in)
+        print(f"  After trim: {len(trimmed)} samples @ {src_rate}Hz")
 
-        # Truncate to max duration
+        # Resample, truncated to max duration
         max_samples = int(max_dur * TARGET_RATE)
-        truncated = trimmed[:max_samples]
-        print(f"  Truncated to {max_dur}s: {len(truncated)} samples")
+        resampled = resample(trimmed, src_rate, TARGET_RATE, max_out=max_samples)
+        print(f"  Resampled (max {max_dur}s): {len(resampled)} samples @ {TARGET_RATE}Hz "
+              f"({len(resampled) / TARGET_RATE:.3f}s)")
 
         # Normalize
-        normalized = normalize(truncated)
+        normalized = normalize(resampled)
 
         # Align to BRR blocks
-        aligned = align_brr(list(normalized))
+        aligned = align_brr(normalized)
         print(f"  BRR-aligned: {len(aligned)} samples")
 
         # Write intermediate WAV
         write_wav(wav_out, aligned, TARGET_RATE)
+        pending.append((out_name, wav_out, brr_out))
+
+    # Convert to BRR: snesbrr runs are independent, so overlap them
+    print(f"\nEncoding {len(pending)} BRR files...")
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = list(executor.map(convert_to_brr,
+                                    [p[1] for p in pending],
+                                    [p[2] for p in pending]))
 
-        # Convert to BRR
-        if convert_to_brr(wav_out, brr_out):
+    for (out_name, wav_out, brr_out), ok in zip(pending, results):
+        if ok:
             brr_size = os.path.getsize(brr_out)
             total_brr_size += brr_size
-            print(f"  BRR output: {brr_size} bytes")
+            print(f"  {out_name}: {brr_size} bytes")
             success += 1
         else:
-            print(f"  FAILED to convert to BRR")
+            print(f"  {out_name}: FAILED to convert to BRR")
 
     print(f"\n=== Results ===")
     print(f"Converted: {success}/{len(MAPPINGS)}")
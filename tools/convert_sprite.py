@@ -5,16 +5,21 @@ Takes a high-res RGBA PNG, resizes to target dimensions, reduces to 15 colors
 plus transparent index 0, and outputs an indexed-mode PNG suitable for gfx4snes.
 
 Usage:
-    python convert_sprite.py INPUT OUTPUT --size 32 [--colors 15]
+    python convert_sprite.py INPUT OUTPUT --size 32 [--colors 15] [--method mediancut]
 """
 
 import argparse
 import os
 import sys
+
+import numpy as np
 from PIL import Image
 
+from convert_common import QUANTIZE_METHODS, quantize_method, resize_filter
+
 
-def convert_sprite(input_path, output_path, size, max_colors=15):
+def convert_sprite(input_path, output_path, size, max_colors=15, method="mediancut",
+                   image=None):
     """Convert an RGBA PNG to a SNES-compatible indexed PNG.
 
     Args:
@@ -22,52 +27,47 @@ def convert_sprite(input_path, output_path, size, max_colors=15):
         output_path: Path for output indexed PNG.
         size: Target width and height (square).
         max_colors: Maximum opaque colors (1-15). Index 0 is transparent.
+        method: Quantizer name, one of QUANTIZE_METHODS.
+        image: Already-decoded source image to use instead of opening
+            input_path. It is not modified.
     """
     if max_colors < 1 or max_colors > 15:
         print(f"Error: colors must be 1-15, got {max_colors}", file=sys.stderr)
         sys.exit(1)
 
-    # Open and convert to RGBA
-    img = Image.open(input_path).convert("RGBA")
+    # Open and convert to RGBA (convert always returns a new image)
+    if image is None:
+        image = Image.open(input_path)
+    img = image.convert("RGBA")
 
-    # Resize to target dimensions
-    img = img.resize((size, size), Image.LANCZOS)
+    # Resize to target dimensions (skip if already there)
+    if img.size != (size, size):
+        img = img.resize((size, size),
+                         resize_filter(img.size, (size, size), Image.LANCZOS))
 
     # Split into RGB and alpha
     r, g, b, a = img.split()
     rgb = Image.merge("RGB", (r, g, b))
 
     # Build transparency mask: True where pixel is transparent
-    alpha_data = list(a.getdata())
-    transparent_mask = [val < 128 for val in alpha_data]
+    transparent_mask = np.asarray(a) < 128
 
-    # Quantize RGB to max_colors using median cut
-    quantized = rgb.quantize(colors=max_colors, method=Image.Quantize.MEDIANCUT)
-    quant_data = list(quantized.getdata())
+    # Quantize RGB to max_colors (alpha is handled by the mask above)
+    quantized = rgb.quantize(colors=max_colors, method=quantize_method(method))
     quant_palette = quantized.getpalette()  # flat [R,G,B,R,G,B,...]
 
-    # Build new palette: index 0 = black (transparent), indices 1-N = quantized colors
-    new_palette = [0, 0, 0]  # index 0: transparent (black)
-    for i in range(max_colors):
-        idx = i * 3
-        new_palette.extend(quant_palette[idx:idx + 3])
-    # Pad palette to 256 entries (768 bytes)
-    while len(new_palette) < 768:
-        new_palette.append(0)
-
-    # Create output indexed image
-    out = Image.new("P", (size, size))
-    out.putpalette(new_palette)
+    # Build new palette: index 0 = black (transparent), indices 1-N = quantized colors,
+    # padded to 256 entries (768 bytes)
+    new_palette = (b"\x00\x00\x00" + bytes(quant_palette[:max_colors * 3])).ljust(768, b"\x00")
 
     # Map pixels: transparent -> index 0, opaque -> quantized index + 1
-    out_data = []
-    for i in range(len(quant_data)):
-        if transparent_mask[i]:
-            out_data.append(0)
-        else:
-            out_data.append(quant_data[i] + 1)
+    out_arr = np.array(quantized, dtype=np.uint8)  # writable uint8 copy
+    np.add(out_arr, 1, out=out_arr)
+    out_arr[transparent_mask] = 0
 
-    out.putdata(out_data)
+    # Create output indexed image, mapped directly over out_arr's buffer
+    out = Image.frombuffer("P", (size, size), out_arr, "raw", "P", 0, 1)
+    out.putpalette(new_palette)
 
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
@@ -84,13 +84,16 @@ def main():
                         choices=[8, 16, 32, 64], help="Target size (square)")
     parser.add_argument("--colors", type=int, default=15,
                         help="Max opaque colors (1-15, default 15)")
+    parser.add_argument("--method", default="mediancut",
+                        choices=sorted(QUANTIZE_METHODS),
+                        help="Color quantizer (default mediancut)")
     args = parser.parse_args()
 
     if not os.path.isfile(args.input):
         print(f"Error: Input file not found: {args.input}", file=sys.stderr)
         sys.exit(1)
 
-    convert_sprite(args.input, args.output, args.size, args.colors)
+    convert_sprite(args.input, args.output, args.size, args.colors, args.method)
 
 
 if __name__ == "__main__":